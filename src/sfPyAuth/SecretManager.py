@@ -80,11 +80,11 @@ class localSecretsManager:
             with open(self.tokenPath, 'w') as file:
                 file.write(data)
             print('Tokens saved successfully! \n')
-            return
+            return True
         
         except Exception as e:
             print(f'Error while saving the token: {e} \n\n')
-            return
+            return False
         
     def get_secret(self):
         """
@@ -17,6 +17,13 @@ Usage:
 
     oauth.checkTokenExpiry()
 
+    # Headless/container use: construction returns immediately and the token refresh
+    # is retried in the background. Set SF_NON_INTERACTIVE=true or pass nonInteractive=True.
+    oauth = oAuthController(nonInteractive=True)
+    if oauth.waitUntilReady(timeout=30):
+        # Perform actions with authenticated session
+    oauth.onReady(lambda controller: print(controller.initState))
+
     sf = Salesforce(instance_url=oAuth.sf_instanceUrl, session_id=oAuth.sf_access_token)
     result = sf.query("SELECT Id FROM Account LIMIT 1")
 """
@@ -29,6 +36,7 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import sys
 import select
+import threading
 
 try:
     from .SecretManager import SecretsManager
@@ -37,16 +45,47 @@ except ImportError:
     
 devmode : bool = False
 
+# Backoff settings (in seconds) for the background initialization in non-interactive mode.
+initRetryDelay : float = 1.0
+initRetryMaxDelay : float = 300.0
+# Number of attempts before the background initialization gives up. None retries until stopped.
+initMaxAttempts : int = 10
+# Timeout (in seconds) for the token requests made by the background initialization.
+requestTimeout : float = 30.0
+
 class oAuthController:
     def __new__(cls, *args, **kwargs):
         if not hasattr(cls, '_instance'):
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, nonInteractive : bool = None):
         
+        # __init__ runs on every call to the singleton. The readiness primitives are only created once
+        # so existing waiters and callbacks are kept.
+        if not hasattr(self, '_readyLock'):
+            self._readyLock = threading.Lock()
+            self._readyEvent = threading.Event()
+            self._stopEvent = threading.Event()
+            self._readyCallbacks : list = []
+            self._initThread : threading.Thread = None
+            self.nonInteractive : bool = False
+            self.initComplete : bool = False
+            self.initState : str = 'pending'
+
+        # Don't start a second initialization while the background one is still running.
+        elif self._initThread != None and self._initThread.is_alive():
+            if nonInteractive == False:
+                print('Background initialization is already in progress, ignoring nonInteractive=False.')
+            else:
+                print('Background initialization is already in progress.')
+            return
+
         ## Populate instance variables from .env file
         load_dotenv()        
+        if nonInteractive == None:
+            nonInteractive = str(os.getenv('SF_NON_INTERACTIVE')).lower() in ('1', 'true', 'yes')
+        self.nonInteractive : bool = nonInteractive
         self.sf_username : str = os.getenv('SF_USERNAME')
         self.sf_password : str = os.getenv('SF_PASSWORD')
         self.sf_consumer_key : str = os.getenv('SF_CLIENT_ID')
@@ -57,17 +96,38 @@ class oAuthController:
         
         self.sf_access_token_expires : str = None
 
+        # Initialization state: 'pending', 'ready' or 'failed'
+        self.initComplete : bool = False
+        self.initState : str = 'pending'
+        self.lastTokenStatusCode : int = None
+        self.sm : SecretsManager = None
+        self._readyEvent.clear()
+        self._stopEvent.clear()
+
         # Check if the required info is available before moving on.
         if not self.sf_username or not self.sf_consumer_key or not self.sf_consumer_secret:
+            if self.nonInteractive:
+                print('Error: Salesforce credentials are not set in the environment variables.')
+                self._setInitState('failed')
+                return
             print('Error: Salesforce credentials are not set in the environment variables. Exiting...')
             os._exit(1)
            
-        self.sm = SecretsManager()
-        secrets = self.sm.get_secret()
-        self.accessToken = secrets['accessToken'] if 'accessToken' in secrets else None
-        self.refreshToken = secrets['refreshToken'] if 'refreshToken' in secrets else None
+        if self.nonInteractive:
+            # Return straight away. The secret store is loaded and the tokens refreshed in the background.
+            self._initThread = threading.Thread(target=self.backgroundInitTasks, name='sfPyAuthInit', daemon=True)
+            self._initThread.start()
+            return
+
+        try:
+            self.sm = SecretsManager()
+            self.loadSecrets()
+        except Exception as e:
+            print(f'Error while loading the tokens from the secret store: {e}')
+            self._setInitState('failed')
+            return
                 
-        self.initComplete : bool = self.initTasks()
+        self._setInitState('ready' if self.initTasks() else 'failed')
         if self.initComplete:
             accessTokenWorks = self.testAccessToken()
             if not accessTokenWorks:
@@ -78,6 +138,147 @@ class oAuthController:
             os._exit(1)       
    
     
+    def loadSecrets(self):
+        """
+        Loads the access and refresh tokens from the secret manager into the instance variables.
+        """
+
+        secrets = self.sm.get_secret() or {}
+        self.accessToken = secrets['accessToken'] if 'accessToken' in secrets else None
+        self.refreshToken = secrets['refreshToken'] if 'refreshToken' in secrets else None
+
+
+    def _setInitState(self, state : str):
+        """
+        Updates the initialization state and notifies anyone waiting on or subscribed to readiness.
+        The first state set wins, so a late result from the background thread cannot override a stop.
+        Args:
+            state (str): 'ready' or 'failed'.
+        """
+
+        with self._readyLock:
+            if self._readyEvent.is_set():
+                return
+            self.initState = state
+            self.initComplete = state == 'ready'
+            callbacks = self._readyCallbacks
+            self._readyCallbacks = []
+            self._readyEvent.set()
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f'Error in onReady callback: {e}')
+
+
+    def waitUntilReady(self, timeout : float = None):
+        """
+        Blocks until initialization has finished or the timeout has passed.
+        Args:
+            timeout (float): Maximum number of seconds to wait. Waits indefinitely if None.
+        Returns:
+            bool: True if the controller is ready to use, False otherwise.
+        """
+
+        self._readyEvent.wait(timeout)
+        return self.initComplete
+
+
+    def onReady(self, callback):
+        """
+        Registers a callback to be called with the controller once initialization has finished.
+        The callback is called straight away if initialization has already finished.
+        Check `initComplete` or `initState` in the callback to tell success from failure.
+        Args:
+            callback (callable): Function accepting the oAuthController instance.
+        """
+
+        with self._readyLock:
+            if not self._readyEvent.is_set():
+                self._readyCallbacks.append(callback)
+                return
+
+        callback(self)
+
+
+    def stopBackgroundInit(self, timeout : float = None):
+        """
+        Stops the background initialization retries. The controller is marked as failed if it is not ready yet.
+        Args:
+            timeout (float): Maximum number of seconds to wait for the background thread. Defaults to `requestTimeout`.
+        """
+
+        self._stopEvent.set()
+        if self._initThread != None and self._initThread is not threading.current_thread():
+            self._initThread.join(requestTimeout if timeout == None else timeout)
+        if not self._readyEvent.is_set():
+            self._setInitState('failed')
+
+
+    def backgroundInitTasks(self):
+        """
+        Non-interactive initialization. Retries the refresh token flow with exponential backoff until it succeeds
+        and the access token works, `initMaxAttempts` is reached or `stopBackgroundInit` is called.
+        The secret store is (re)loaded before each attempt so tokens written to it by another process are picked up.
+        A refresh token rejected with a 4xx response (e.g. revoked) fails straight away, unless the secret store
+        holds a different refresh token by then.
+        """
+
+        delay : float = initRetryDelay
+        attempt : int = 1
+        while not self._stopEvent.is_set():
+            self.lastTokenStatusCode = None
+            refreshTokenUpdated : bool = False
+            accessTokenWorks : bool = False
+            try:
+                if self.sm == None:
+                    self.sm = SecretsManager()
+                self.loadSecrets()
+                if self.refreshToken:
+                    refreshTokenUpdated = self.getOauthTokens(timeout=requestTimeout)
+                else:
+                    print('Refresh token is not available in the secret store yet.')
+                if refreshTokenUpdated and not self._stopEvent.is_set():
+                    accessTokenWorks = self.testAccessToken(timeout=requestTimeout)
+            except Exception as e:
+                print(f'Error while updating the refresh token: {e}')
+
+            if self._stopEvent.is_set():
+                return
+
+            if accessTokenWorks:
+                print('Refresh and Access tokens have been updated successfully, and is ready to use.')
+                self._setInitState('ready')
+                return
+            if refreshTokenUpdated:
+                print('Access token is not valid!')
+
+            if self.lastTokenStatusCode != None and 400 <= self.lastTokenStatusCode < 500 and self.lastTokenStatusCode not in (408, 429):
+                rejectedRefreshToken : str = self.refreshToken
+                try:
+                    self.loadSecrets()
+                except Exception as e:
+                    print(f'Error while loading the tokens from the secret store: {e}')
+                if self.refreshToken == rejectedRefreshToken:
+                    print(f'Refresh token was rejected with status code {self.lastTokenStatusCode}. Giving up.')
+                    break
+                print('Refresh token was rejected, but the secret store holds a different one.')
+
+            if initMaxAttempts != None and attempt >= initMaxAttempts:
+                print(f'Initialization failed after {attempt} attempts. Giving up.')
+                break
+
+            print(f'Initialization attempt {attempt} failed. Retrying in {delay} seconds...')
+            if self._stopEvent.wait(delay):
+                return
+            delay = min(delay * 2, initRetryMaxDelay)
+            attempt += 1
+
+        self._setInitState('failed')
+
+    
+    
     def getSecretCodeFromOauth(self):
         """
         **REQUIRES USER INTERACTION AND WEB BROWSER**
@@ -104,9 +305,11 @@ class oAuthController:
         return secretCode
     
         
-    def testAccessToken(self):
+    def testAccessToken(self, timeout : float = None):
         """
         Tests the validity of the Salesforce access token by querying the Account object.
+        Args:
+            timeout (float): Timeout in seconds for the request. Waits indefinitely if None.
         Returns:
             bool: True if the access token is valid, False otherwise.
         """
@@ -124,7 +327,7 @@ class oAuthController:
             'Authorization' : f'Bearer {self.accessToken}'
         }
 
-        response = requests.request("GET", url, headers=headers)  
+        response = requests.request("GET", url, headers=headers, timeout=timeout)  
 
         # Handler the response.
         if response.status_code == 200:
@@ -140,13 +343,17 @@ class oAuthController:
             return False
 
 
-    def getOauthTokens(self):
+    def getOauthTokens(self, timeout : float = None):
         """
         Obtains a new refresh token using OAuth flow and class based variables.
+        The status code of the token request is kept in `lastTokenStatusCode`.
+        Args:
+            timeout (float): Timeout in seconds for the token request. Waits indefinitely if None.
         Returns:
-            bool: True if the refresh token is successfully obtained and updated, False otherwise.
+            bool: True if the tokens are valid and saved (or unchanged), False otherwise.
         """
 
+        self.lastTokenStatusCode = None
         if not self.refreshToken:
             print('Refresh token is not set, cannot proceed')
             return False
@@ -163,7 +370,8 @@ class oAuthController:
             'refresh_token' : self.refreshToken
         }
 
-        response = requests.request("POST", oauthUrl, headers=headers, data=payload)
+        response = requests.request("POST", oauthUrl, headers=headers, data=payload, timeout=timeout)
+        self.lastTokenStatusCode = response.status_code
 
         saveResult : bool = False
         if response.status_code != 200:
@@ -189,6 +397,9 @@ class oAuthController:
                 print('Refresh token has been updated successfully')
                 
                 saveResult = self.sm.set_secret(self.accessToken, self.refreshToken)
+            else:
+                print('Tokens are unchanged, nothing to save')
+                return True
         
         if saveResult:
             print(f'New access token and refesh token saved successfully. \n')
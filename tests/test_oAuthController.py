@@ -6,8 +6,20 @@ import unittest
 from datetime import datetime, timedelta
 from unittest.mock import patch, mock_open, MagicMock
 import os
+import threading
 # Adjust the import statement to correctly reference the sfPyAuth module
 from src.sfPyAuth.sfPyAuth import oAuthController
+from src.sfPyAuth.SecretManager import localSecretsManager
+
+def resetSingleton():
+    """
+    Stops any background initialization and drops the cached oAuthController instance, so each test starts fresh.
+    """
+    instance = oAuthController.__dict__.get('_instance')
+    if instance != None and getattr(instance, '_initThread', None) != None:
+        instance.stopBackgroundInit(timeout=1)
+    if '_instance' in oAuthController.__dict__:
+        del oAuthController._instance
 
 class TestoAuthController(unittest.TestCase):
 
@@ -19,6 +31,13 @@ class TestoAuthController(unittest.TestCase):
         """
         Set up the test environment by mocking environment variables and initializing the oAuthController instance.
         """
+        resetSingleton()
+        self.addCleanup(resetSingleton)
+        patcher = patch('src.sfPyAuth.sfPyAuth.SecretsManager')
+        self.mock_sm = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.mock_sm.get_secret.return_value = {'accessToken': 'old_access_token', 'refreshToken': 'old_refresh_token'}
+        self.mock_sm.set_secret.return_value = True
         mock_getenv.side_effect = lambda key: {
             'SF_USERNAME': 'test_username',
             'SF_PASSWORD': 'test_password',
@@ -29,12 +48,14 @@ class TestoAuthController(unittest.TestCase):
         mock_request.return_value.status_code = 200
         mock_request.return_value.json.return_value = {
             'access_token': 'test_access_token',
-            'refresh_token': 'test_refresh_token'
+            'refresh_token': 'test_refresh_token',
+            'instance_url': 'https://test.salesforce.com',
+            'totalSize': 1
         }
         self.oauth = oAuthController()
 
-    @patch('src.sfPyAuth.sfPyAuth.os.path.exists')
-    @patch('src.sfPyAuth.sfPyAuth.os.path.isfile')
+    @patch('src.sfPyAuth.SecretManager.os.path.exists')
+    @patch('src.sfPyAuth.SecretManager.os.path.isfile')
     @patch('builtins.open', new_callable=mock_open, read_data='accessToken=test_access_token\nrefreshToken=test_refresh_token\n')
     def test_localTokenHandler_load(self, mock_open, mock_isfile, mock_exists):
         """
@@ -43,20 +64,23 @@ class TestoAuthController(unittest.TestCase):
         """
         mock_exists.return_value = True
         mock_isfile.return_value = True
-        result = self.oauth.localTokenHandler_load()
+        result = localSecretsManager().get_secret()
         self.assertTrue(result)
-        self.assertEqual(self.oauth.sf_access_token, 'test_access_token')
-        self.assertEqual(self.oauth.sf_refresh_token, 'test_refresh_token')
+        self.mock_sm.get_secret.return_value = result
+        self.oauth.loadSecrets()
+        self.assertEqual(self.oauth.accessToken, 'test_access_token')
+        self.assertEqual(self.oauth.refreshToken, 'test_refresh_token')
 
+    @patch('src.sfPyAuth.SecretManager.os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    def test_localTokenHandler_save(self, mock_open):
+    def test_localTokenHandler_save(self, mock_open, mock_exists):
         """
         Test saving tokens to a local file.
         Expected outcome: Tokens are saved successfully to the specified file.
         """
-        self.oauth.sf_access_token = 'test_access_token'
-        self.oauth.sf_refresh_token = 'test_refresh_token'
-        result = self.oauth.localTokenHandler_save()
+        self.oauth.accessToken = 'test_access_token'
+        self.oauth.refreshToken = 'test_refresh_token'
+        result = localSecretsManager().set_secret(self.oauth.accessToken, self.oauth.refreshToken)
         self.assertTrue(result)
         mock_open().write.assert_called_with('accessToken=test_access_token\nrefreshToken=test_refresh_token\n')
 
@@ -73,8 +97,8 @@ class TestoAuthController(unittest.TestCase):
         }
         result = self.oauth.webServerFlow('test_secret_code')
         self.assertTrue(result)
-        self.assertEqual(self.oauth.sf_access_token, 'test_access_token')
-        self.assertEqual(self.oauth.sf_refresh_token, 'test_refresh_token')
+        self.assertEqual(self.oauth.accessToken, 'test_access_token')
+        self.assertEqual(self.oauth.refreshToken, 'test_refresh_token')
 
     @patch('src.sfPyAuth.sfPyAuth.requests.request')
     def test_testAccessToken(self, mock_request):
@@ -82,7 +106,7 @@ class TestoAuthController(unittest.TestCase):
         Test the validity of the access token by querying the Salesforce API.
         Expected outcome: The access token is valid and the query returns a successful response.
         """
-        self.oauth.sf_access_token = 'test_access_token'
+        self.oauth.accessToken = 'test_access_token'
         self.oauth.sf_instanceUrl = 'https://test.salesforce.com'
         mock_request.return_value.status_code = 200
         mock_request.return_value.json.return_value = {'totalSize': 1}
@@ -95,16 +119,371 @@ class TestoAuthController(unittest.TestCase):
         Test obtaining a new refresh token using the existing refresh token.
         Expected outcome: A new refresh token and access token are obtained and assigned to the instance variables.
         """
-        self.oauth.sf_refresh_token = 'test_refresh_token'
+        self.oauth.refreshToken = 'test_refresh_token'
         mock_request.return_value.status_code = 200
         mock_request.return_value.json.return_value = {
             'access_token': 'new_access_token',
-            'refresh_token': 'new_refresh_token'
+            'refresh_token': 'new_refresh_token',
+            'instance_url': 'https://test.salesforce.com'
         }
         result = self.oauth.getOauthTokens()
         self.assertTrue(result)
-        self.assertEqual(self.oauth.sf_access_token, 'new_access_token')
-        self.assertEqual(self.oauth.sf_refresh_token, 'new_refresh_token')
+        self.assertEqual(self.oauth.accessToken, 'new_access_token')
+        self.assertEqual(self.oauth.refreshToken, 'new_refresh_token')
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_reconstructionRefreshesTokens(self, mock_request):
+        """
+        Test constructing the singleton again in interactive mode.
+        Expected outcome: The same instance is returned and the tokens are refreshed again.
+        """
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json.return_value = {
+            'access_token': 'newer_access_token',
+            'refresh_token': 'newer_refresh_token',
+            'instance_url': 'https://test.salesforce.com',
+            'totalSize': 1
+        }
+        with patch('src.sfPyAuth.sfPyAuth.os.getenv', side_effect=lambda key: {
+            'SF_USERNAME': 'test_username',
+            'SF_CLIENT_ID': 'test_client_id',
+            'SF_CLIENT_SECRET': 'test_client_secret'
+        }.get(key)):
+            again = oAuthController()
+        self.assertIs(again, self.oauth)
+        self.assertEqual(again.initState, 'ready')
+        self.assertEqual(again.accessToken, 'newer_access_token')
+
+class TestoAuthControllerNonInteractive(unittest.TestCase):
+
+    env = {
+        'SF_USERNAME': 'test_username',
+        'SF_CLIENT_ID': 'test_client_id',
+        'SF_CLIENT_SECRET': 'test_client_secret',
+        'SF_INSTANCE_URL': 'https://test.salesforce.com'
+    }
+
+    def setUp(self):
+        """
+        Mock the environment and secret manager so no user input or real secret store is used.
+        """
+        resetSingleton()
+        self.addCleanup(resetSingleton)
+        patchers = [
+            patch('src.sfPyAuth.sfPyAuth.load_dotenv'),
+            patch('src.sfPyAuth.sfPyAuth.os.getenv', side_effect=lambda key: self.env.get(key)),
+            patch('src.sfPyAuth.sfPyAuth.SecretsManager'),
+            patch('src.sfPyAuth.sfPyAuth.initRetryDelay', 0.01),
+            patch('builtins.input', side_effect=AssertionError('input() must not be called')),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.mock_SecretsManager = mocks[2]
+        self.mock_sm = mocks[2].return_value
+        self.mock_sm.get_secret.return_value = {'accessToken': 'old_access_token', 'refreshToken': 'old_refresh_token'}
+        self.mock_sm.set_secret.return_value = True
+        self.tokenStatuses = []
+        self.tokenCalls = 0
+        self.queryStatus = 200
+        self.requestGate = threading.Event()
+        self.requestGate.set()
+
+    def fakeRequest(self, method, url, **kwargs):
+        """
+        Stands in for requests.request. Token requests (POST) return the next status in `tokenStatuses`
+        (200 once the list runs out) and access token queries (GET) return `queryStatus`.
+        """
+        response = MagicMock()
+        if method == 'POST':
+            self.requestGate.wait(5)
+            response.status_code = self.tokenStatuses[self.tokenCalls] if self.tokenCalls < len(self.tokenStatuses) else 200
+            self.tokenCalls += 1
+            response.json.return_value = {
+                'access_token': f'new_access_token_{self.tokenCalls}',
+                'refresh_token': 'new_refresh_token',
+                'instance_url': 'https://test.salesforce.com'
+            }
+        else:
+            response.status_code = self.queryStatus
+            response.json.return_value = {'totalSize': 1}
+        return response
+
+    def initThreads(self):
+        return [thread for thread in threading.enumerate() if thread.name == 'sfPyAuthInit' and thread.is_alive()]
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_retriesUntilReady(self, mock_request):
+        """
+        Test that construction returns in a pending state and the refresh is retried in the background.
+        Expected outcome: The controller becomes ready after the failed attempts and callbacks are notified.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.tokenStatuses = [500, 500]
+        self.requestGate.clear()
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertEqual(oauth.initState, 'pending')
+        self.assertFalse(oauth.initComplete)
+
+        callback = MagicMock()
+        oauth.onReady(callback)
+        self.requestGate.set()
+
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'ready')
+        self.assertEqual(oauth.accessToken, 'new_access_token_3')
+        self.assertEqual(self.tokenCalls, 3)
+        callback.assert_called_once_with(oauth)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_waitTimesOutAndStops(self, mock_request):
+        """
+        Test waiting on a controller that cannot refresh its tokens.
+        Expected outcome: waitUntilReady returns False after the timeout and stopping marks the controller as failed.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.tokenStatuses = [500] * 100
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertFalse(oauth.waitUntilReady(timeout=0.05))
+        self.assertEqual(oauth.initState, 'pending')
+
+        oauth.stopBackgroundInit()
+        self.assertEqual(oauth.initState, 'failed')
+        callback = MagicMock()
+        oauth.onReady(callback)
+        callback.assert_called_once_with(oauth)
+
+    def test_missingCredentials(self):
+        """
+        Test non-interactive construction without Salesforce credentials.
+        Expected outcome: The controller is marked as failed instead of exiting the process.
+        """
+        self.env = {}
+        oauth = oAuthController(nonInteractive=True)
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertFalse(oauth.waitUntilReady(timeout=0))
+
+    @patch('src.sfPyAuth.sfPyAuth.initMaxAttempts', 2)
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_secretStoreErrorStaysPending(self, mock_request):
+        """
+        Test non-interactive construction when the secret store cannot be created.
+        Expected outcome: The constructor returns in a pending state and the error is handled in the background.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.requestGate.clear()
+        def secretsManager():
+            self.requestGate.wait(5)
+            raise AttributeError("'SecretsManager' object has no attribute '_secretsManager'")
+        self.mock_SecretsManager.side_effect = secretsManager
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertEqual(oauth.initState, 'pending')
+        self.requestGate.set()
+        self.assertFalse(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertEqual(self.mock_SecretsManager.call_count, 2)
+        mock_request.assert_not_called()
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_secretStoreRecovers(self, mock_request):
+        """
+        Test a secret store which fails to load before it recovers.
+        Expected outcome: The constructor returns in a pending state and the controller becomes ready.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.requestGate.clear()
+        self.mock_sm.get_secret.side_effect = [
+            Exception('Secret store is not reachable'),
+            {'accessToken': 'old_access_token', 'refreshToken': 'old_refresh_token'}
+        ]
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertEqual(oauth.initState, 'pending')
+        self.requestGate.set()
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(self.tokenCalls, 1)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_reconstructionReusesInit(self, mock_request):
+        """
+        Test constructing the singleton again while the background initialization is still running.
+        Expected outcome: No second init thread is started, and earlier waiters and callbacks are notified.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.requestGate.clear()
+
+        oauth = oAuthController(nonInteractive=True)
+        callback = MagicMock()
+        oauth.onReady(callback)
+        waitResult = []
+        waiter = threading.Thread(target=lambda: waitResult.append(oauth.waitUntilReady(timeout=5)))
+        waiter.start()
+
+        again = oAuthController(nonInteractive=True)
+        conflicting = oAuthController(nonInteractive=False)
+        self.assertIs(again, oauth)
+        self.assertIs(conflicting, oauth)
+        self.assertTrue(oauth.nonInteractive)
+        self.assertEqual(len(self.initThreads()), 1)
+
+        self.requestGate.set()
+        waiter.join(5)
+        self.assertEqual(waitResult, [True])
+        callback.assert_called_once_with(oauth)
+        self.assertEqual(self.tokenCalls, 1)
+
+        # Once ready, constructing again refreshes the tokens again.
+        oAuthController(nonInteractive=True)
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(self.tokenCalls, 2)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_unchangedTokensAreReady(self, mock_request):
+        """
+        Test a successful refresh which returns the tokens already held.
+        Expected outcome: The controller is ready after a single attempt.
+        """
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {
+            'access_token': 'old_access_token',
+            'refresh_token': 'old_refresh_token',
+            'instance_url': 'https://test.salesforce.com',
+            'totalSize': 1
+        }
+        mock_request.return_value = response
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual([call.args[0] for call in mock_request.call_args_list], ['POST', 'GET'])
+        self.mock_sm.set_secret.assert_not_called()
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_invalidAccessTokenRetries(self, mock_request):
+        """
+        Test a refresh which succeeds but returns an access token that does not work.
+        Expected outcome: The controller is not ready and the refresh is retried.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.queryStatus = 401
+
+        with patch('src.sfPyAuth.sfPyAuth.initMaxAttempts', 2):
+            oauth = oAuthController(nonInteractive=True)
+            self.assertFalse(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertEqual(self.tokenCalls, 2)
+        self.assertEqual(mock_request.call_args.kwargs['timeout'], 30.0)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_rejectedRefreshTokenFails(self, mock_request):
+        """
+        Test a refresh token rejected by Salesforce with a 4xx response (e.g. invalid_grant).
+        Expected outcome: The secret store is checked again and, as the token is unchanged, the controller fails without retrying.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.tokenStatuses = [400]
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertFalse(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertEqual(self.tokenCalls, 1)
+        self.assertEqual(self.mock_sm.get_secret.call_count, 2)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_rejectedRefreshTokenReplaced(self, mock_request):
+        """
+        Test a refresh token rejected by Salesforce after another process has stored a new one.
+        Expected outcome: The new refresh token is used and the controller becomes ready.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.tokenStatuses = [400]
+        self.mock_sm.get_secret.side_effect = [
+            {'accessToken': 'old_access_token', 'refreshToken': 'revoked_refresh_token'},
+            {'accessToken': 'old_access_token', 'refreshToken': 'provisioned_refresh_token'},
+            {'accessToken': 'old_access_token', 'refreshToken': 'provisioned_refresh_token'}
+        ]
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(self.tokenCalls, 2)
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_missingRefreshTokenWaitsForProvisioning(self, mock_request):
+        """
+        Test non-interactive construction before a refresh token has been stored.
+        Expected outcome: The secret store is reloaded with backoff and the controller becomes ready once the token appears.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.mock_sm.get_secret.side_effect = [
+            None,
+            {'accessToken': None, 'refreshToken': None},
+            {'accessToken': None, 'refreshToken': 'provisioned_refresh_token'}
+        ]
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertTrue(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(self.mock_sm.get_secret.call_count, 3)
+        self.assertEqual(self.tokenCalls, 1)
+
+    @patch('src.sfPyAuth.sfPyAuth.initMaxAttempts', 3)
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_missingRefreshTokenFails(self, mock_request):
+        """
+        Test non-interactive construction when a refresh token is never stored.
+        Expected outcome: The controller is marked as failed after `initMaxAttempts` attempts without sending a request.
+        """
+        self.mock_sm.get_secret.return_value = None
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertFalse(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertEqual(self.mock_sm.get_secret.call_count, 3)
+        mock_request.assert_not_called()
+
+    @patch('src.sfPyAuth.sfPyAuth.initMaxAttempts', 3)
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_maxAttemptsFails(self, mock_request):
+        """
+        Test a refresh which keeps failing with a server error.
+        Expected outcome: The controller is marked as failed after `initMaxAttempts` attempts, each with a timeout.
+        """
+        mock_request.side_effect = self.fakeRequest
+        self.tokenStatuses = [500] * 3
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertFalse(oauth.waitUntilReady(timeout=5))
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertEqual(self.tokenCalls, 3)
+        self.assertIsNotNone(mock_request.call_args.kwargs['timeout'])
+
+    @patch('src.sfPyAuth.sfPyAuth.requests.request')
+    def test_stopWhileRequestInFlight(self, mock_request):
+        """
+        Test stopping the background initialization while a token request hangs.
+        Expected outcome: stopBackgroundInit returns after its timeout and the late response does not make the controller ready.
+        """
+        requestStarted = threading.Event()
+        releaseRequest = threading.Event()
+        def request(*args, **kwargs):
+            requestStarted.set()
+            releaseRequest.wait(5)
+            return self.fakeRequest(*args, **kwargs)
+        mock_request.side_effect = request
+
+        oauth = oAuthController(nonInteractive=True)
+        self.assertTrue(requestStarted.wait(5))
+        oauth.stopBackgroundInit(timeout=0.05)
+        self.assertEqual(oauth.initState, 'failed')
+
+        releaseRequest.set()
+        oauth._initThread.join(5)
+        self.assertFalse(oauth._initThread.is_alive())
+        self.assertEqual(oauth.initState, 'failed')
+        self.assertFalse(oauth.waitUntilReady(timeout=0))
+        self.assertEqual(self.tokenCalls, 1)
 
 if __name__ == '__main__':
     unittest.main()